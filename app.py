@@ -1,18 +1,32 @@
-from flask import Flask, render_template, request, flash, redirect, url_for
+from flask import Flask, Response, render_template, request, flash, redirect, url_for, session
+from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import case, event, func, text
+import numpy as np
 import pandas as pd
 from mlxtend.frequent_patterns import apriori, association_rules
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import nltk
+import ahocorasick
 import random
+import re
 import os
+from functools import lru_cache
+from collections import defaultdict
 from datetime import datetime
 import matplotlib
 matplotlib.use("Agg")  # render charts without a display
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-# Ensure VADER lexicon is available
-nltk.download('vader_lexicon')
+# Ensure VADER lexicon is available (download only if missing)
+try:
+    nltk.data.find('sentiment/vader_lexicon.zip')
+except LookupError:
+    nltk.download('vader_lexicon')
+
+# Build the analyzer once; loading the lexicon is the expensive part
+SID = SentimentIntensityAnalyzer()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "fallback-secret-key")
@@ -20,6 +34,24 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", "sqlite:/
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+
+def has_pending_flashes():
+    # Pages render flashed messages, so never serve or store them from cache
+    return bool(session.get('_flashes'))
+
+
+def review_cache_key(*args, **kwargs):
+    # Keyed on database state, so an insert through any worker makes every
+    # worker's SimpleCache miss; cache.clear() only frees the local one
+    count, max_id = review_state()
+    return f"view/{request.path}/{count}:{max_id}"
+
+
+def is_ok_response(rv):
+    # Views return rendered HTML as str; only store those and 200 Responses
+    return not isinstance(rv, Response) or rv.status_code == 200
 
 
 # -----------------------------
@@ -29,95 +61,155 @@ class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(1000), nullable=False)
     sentiment_score = db.Column(db.Float, nullable=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
     def __repr__(self):
         short = (self.content or "")[:30].replace("\n", " ")
         return f"<Review {short}...>"
 
 
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer; NORMAL skips the per-commit fsync.
+    # synchronous and cache_size are per connection, so set them on every connect.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-8000")  # ~8MB page cache
+    cursor.close()
+
+
 with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", set_sqlite_pragmas)
     db.create_all()
+    # create_all() skips existing tables, so add the index to older DBs too
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_review_created_at ON review (created_at)"))
+    db.session.commit()
 
 
 # -----------------------------
 # Sentiment analysis
 # -----------------------------
-def analyze_sentiments(reviews):
-    sid = SentimentIntensityAnalyzer()
-    sentiments = [sid.polarity_scores(review) for review in reviews]
-    return pd.DataFrame(sentiments)
+# VADER is deterministic per text, so identical reviews can reuse scores
+@lru_cache(maxsize=4096)
+def _score(text):
+    return SID.polarity_scores(text)['compound']
 
 
 # -----------------------------
 # Extract products from reviews
 # -----------------------------
+# Customize this list to your domain.
+PRODUCT_LIST = [
+    "delivery", "packaging", "taste", "quality", "price", "refund",
+    "app", "support", "burger", "pizza", "fries", "sauce", "combo",
+    "subscription", "drink", "beverage"
+]
+
+# One automaton matches every product keyword in a single pass over the text
+PRODUCT_AUTOMATON = ahocorasick.Automaton()
+for _product in PRODUCT_LIST:
+    PRODUCT_AUTOMATON.add_word(_product, _product)
+PRODUCT_AUTOMATON.make_automaton()
+
+
 def extract_products_from_reviews(reviews):
     """
-    Keyword-based product extractor. Customize this list to your domain.
+    Keyword-based product extractor using PRODUCT_LIST.
+    Returns one set of matched products per review that mentions any.
     """
-    product_list = [
-        "delivery", "packaging", "taste", "quality", "price", "refund",
-        "app", "support", "burger", "pizza", "fries", "sauce", "combo",
-        "subscription", "drink", "beverage"
-    ]
     transactions = []
     for review in reviews:
-        text = (review or "").lower()
-        products_found = [p for p in product_list if p in text]
+        if not review:
+            continue
+        products_found = {p for _, p in PRODUCT_AUTOMATON.iter(review.lower())}
         if products_found:
-            transactions.append(sorted(list(set(products_found))))
+            transactions.append(products_found)
     return transactions
 
 
 # -----------------------------
 # Generate recommendations
 # -----------------------------
-def generate_recommendations(transactions, sentiments):
-    if not transactions:
-        return []
+# Most recently mined (transactions, rules) pair. The key is the corpus itself,
+# so a changed corpus simply misses and replaces it; no invalidation needed.
+_last_rules = (None, None)
 
-    # each row is a list of items -> one-hot basket
-    transaction_df = pd.DataFrame(transactions)
-    basket = pd.get_dummies(transaction_df.apply(pd.Series).stack()).groupby(level=0).sum()
+
+def mine_rules(transactions):
+    """
+    Runs apriori + association_rules and returns the rules indexed by antecedent:
+    {frozenset(antecedents): [(consequents, rule_text, support, confidence, lift), ...]}.
+    The last result is kept, so an unchanged corpus skips mining.
+    """
+    global _last_rules
+    key = tuple(map(frozenset, transactions))
+    if _last_rules[0] == key:
+        return _last_rules[1]
+
+    # each row is a set of items -> boolean one-hot basket
+    products = sorted({p for row in transactions for p in row})
+    col = {p: i for i, p in enumerate(products)}
+    arr = np.zeros((len(transactions), len(products)), dtype=bool)
+    for i, row in enumerate(transactions):
+        for p in row:
+            arr[i, col[p]] = True
+    basket = pd.DataFrame(arr, columns=products)
 
     frequent_itemsets = apriori(basket, min_support=0.1, use_colnames=True)
     if frequent_itemsets.empty:
-        return []
+        _last_rules = (key, {})
+        return {}
 
     rules = association_rules(frequent_itemsets, metric="lift", min_threshold=1)
-    recommendations = []
 
+    # Unpack each rule once and group rules sharing an antecedent, so each
+    # transaction does one subset test per distinct antecedent
+    by_ante = defaultdict(list)
+    for rule in rules.itertuples(index=False):
+        consequents = ', '.join(rule.consequents)
+        by_ante[frozenset(rule.antecedents)].append((
+            consequents,
+            f"{', '.join(rule.antecedents)} -> {consequents}",
+            round(float(rule.support), 3),
+            round(float(rule.confidence), 3),
+            round(float(rule.lift), 3),
+        ))
+
+    by_ante = dict(by_ante)
+    _last_rules = (key, by_ante)
+    return by_ante
+
+
+def generate_recommendations(transactions, sentiments):
+    if not transactions:
+        return []
+
+    by_ante = mine_rules(transactions)
+    if not by_ante:
+        return []
+
+    recommendations = []
     for idx, row in enumerate(transactions):
         if len(row) == 0:
             continue
 
+        tx = set(row)
         sentiment = sentiments.iloc[min(idx, len(sentiments) - 1)]
         positive_review = sentiment['compound'] > 0.05
 
-        for _, rule in rules.iterrows():
-            antecedents = list(rule['antecedents'])
-            consequents = list(rule['consequents'])
-
-            if all(product in row for product in antecedents):
-                if positive_review:
-                    recommendations.append({
-                        "rule": f"{', '.join(antecedents)} -> {', '.join(consequents)}",
-                        "recommended_products": ', '.join(consequents),
-                        "support": round(float(rule['support']), 3),
-                        "confidence": round(float(rule['confidence']), 3),
-                        "lift": round(float(rule['lift']), 3),
-                        "sentiment": "Positive"
-                    })
-                else:
-                    recommendations.append({
-                        "rule": f"{', '.join(antecedents)} -> {', '.join(consequents)}",
-                        "recommended_products": f"Consider improving {', '.join(consequents)}",
-                        "support": round(float(rule['support']), 3),
-                        "confidence": round(float(rule['confidence']), 3),
-                        "lift": round(float(rule['lift']), 3),
-                        "sentiment": "Negative"
-                    })
+        for ante, matched in by_ante.items():
+            if not ante <= tx:
+                continue
+            for consequents, rule_text, support, confidence, lift in matched:
+                recommendations.append({
+                    "rule": rule_text,
+                    "recommended_products": consequents if positive_review else f"Consider improving {consequents}",
+                    "support": support,
+                    "confidence": confidence,
+                    "lift": lift,
+                    "sentiment": "Positive" if positive_review else "Negative"
+                })
 
     return recommendations
 
@@ -125,24 +217,30 @@ def generate_recommendations(transactions, sentiments):
 # -----------------------------
 # Simple (keyword-based) recs
 # -----------------------------
-def generate_simple_recommendations(reviews):
-    positive_keywords = [
-        'good', 'like', 'love', 'wonderful', 'super', 'amazing',
-        'marvellous', 'surprised', 'great', 'excellent', 'fantastic',
-        'awesome', 'perfect'
-    ]
-    negative_keywords = [
-        'hate', 'bad', 'poor', 'disgusting', 'waste', 'not happy',
-        "don't like", 'disappointed', 'awful', 'not satisfied', 'horrible',
-        'terrible', 'worst'
-    ]
-    neutral_keywords = [
-        'okay', 'average', 'fine', 'moderate', 'fair', 'sufficient',
-        'normal', 'acceptable', 'regular', 'standard', 'routine',
-        'usual', 'ordinary', 'typical', 'not sure', 'perhaps', 'maybe',
-        'decent', 'not bad', 'satisfactory'
-    ]
+POSITIVE_KEYWORDS = [
+    'good', 'like', 'love', 'wonderful', 'super', 'amazing',
+    'marvellous', 'surprised', 'great', 'excellent', 'fantastic',
+    'awesome', 'perfect'
+]
+NEGATIVE_KEYWORDS = [
+    'hate', 'bad', 'poor', 'disgusting', 'waste', 'not happy',
+    "don't like", 'disappointed', 'awful', 'not satisfied', 'horrible',
+    'terrible', 'worst'
+]
+NEUTRAL_KEYWORDS = [
+    'okay', 'average', 'fine', 'moderate', 'fair', 'sufficient',
+    'normal', 'acceptable', 'regular', 'standard', 'routine',
+    'usual', 'ordinary', 'typical', 'not sure', 'perhaps', 'maybe',
+    'decent', 'not bad', 'satisfactory'
+]
+
+# One alternation per category so each review needs a single search
+POSITIVE_RE = re.compile('|'.join(map(re.escape, POSITIVE_KEYWORDS)))
+NEGATIVE_RE = re.compile('|'.join(map(re.escape, NEGATIVE_KEYWORDS)))
+NEUTRAL_RE = re.compile('|'.join(map(re.escape, NEUTRAL_KEYWORDS)))
+
 
+def generate_simple_recommendations(reviews):
     positive_recommendations = [
         "It's great to see your positive experience! We recommend trying our new flavors as well; they're fantastic!",
         "Since you enjoyed this product, you might also like our complementary items that enhance the experience!",
@@ -168,18 +266,27 @@ def generate_simple_recommendations(reviews):
         "We’re glad things were okay! We aim to make them great next time."
     ]
 
-    selected_recommendations = []
+    # Classify first, then draw every category's picks in one batch
+    pools = [
+        positive_recommendations,
+        negative_recommendations,
+        neutral_recommendations,
+        ["Thank you for your feedback! We're always looking to improve."],
+    ]
+    categories = []
     for review in reviews:
         content = (review or "").lower()
-        if any(keyword in content for keyword in positive_keywords):
-            recommendation = random.choice(positive_recommendations)
-        elif any(keyword in content for keyword in negative_keywords):
-            recommendation = random.choice(negative_recommendations)
-        elif any(keyword in content for keyword in neutral_keywords):
-            recommendation = random.choice(neutral_recommendations)
+        if POSITIVE_RE.search(content):
+            categories.append(0)
+        elif NEGATIVE_RE.search(content):
+            categories.append(1)
+        elif NEUTRAL_RE.search(content):
+            categories.append(2)
         else:
-            recommendation = "Thank you for your feedback! We're always looking to improve."
-        selected_recommendations.append(recommendation)
+            categories.append(3)
+
+    draws = [iter(random.choices(pool, k=categories.count(i))) for i, pool in enumerate(pools)]
+    selected_recommendations = [next(draws[c]) for c in categories]
 
     return selected_recommendations
 
@@ -193,49 +300,81 @@ def ensure_graph_dir():
     return graph_dir
 
 
+def review_state():
+    """
+    Returns (count, max id) of the stored reviews. Reviews are only ever
+    inserted, so this changes exactly when the data does, and every worker
+    reads the same value from the database.
+    """
+    return db.session.query(func.count(Review.id), func.max(Review.id)).one()
+
+
+def reviews_changed():
+    """
+    Invalidates everything derived from the stored reviews.
+    """
+    cache.clear()
+
+
 def generate_charts():
     """
     Creates bar and pie charts of sentiment categories and saves as PNG.
+    Reuses the PNGs on disk when no review has been added since they were drawn.
     """
-    reviews = Review.query.all()
-    if not reviews:
+    count, max_id = review_state()
+    if not count:
         return None, None
 
-    # Classify into Positive/Neutral/Negative
-    def label(score):
-        if score is None:
-            return "Neutral"
-        if score > 0.05:
-            return "Positive"
-        if score < -0.05:
-            return "Negative"
-        return "Neutral"
-
-    labels = [label(r.sentiment_score) for r in reviews]
-    counts = pd.Series(labels).value_counts().reindex(["Positive", "Neutral", "Negative"]).fillna(0)
-
     graph_dir = ensure_graph_dir()
     bar_path = os.path.join(graph_dir, "sentiment_bar.png")
     pie_path = os.path.join(graph_dir, "sentiment_pie.png")
+    version_path = os.path.join(graph_dir, ".version")
+    version = f"{count}:{max_id}"
+
+    if os.path.exists(bar_path) and os.path.exists(pie_path):
+        try:
+            with open(version_path) as f:
+                if f.read().strip() == version:
+                    return "sentiment_bar.png", "sentiment_pie.png"
+        except OSError:
+            pass
+
+    # Classify into Positive/Neutral/Negative and count in the database;
+    # NULL scores fall through to Neutral
+    label = case(
+        (Review.sentiment_score > 0.05, "Positive"),
+        (Review.sentiment_score < -0.05, "Negative"),
+        else_="Neutral",
+    )
+    tally = dict(db.session.query(label, func.count()).group_by(label).all())
+
+    order = ["Positive", "Neutral", "Negative"]
+    counts = pd.Series([tally.get(k, 0) for k in order], index=order)  # Series for .plot
 
+    # Figures are built directly (no pyplot global state) and drawn at screen DPI
     # Bar chart
-    plt.figure(figsize=(6, 4))
-    counts.plot(kind="bar", color=["#2ecc71", "#3498db", "#e74c3c"])  # Green, Blue, Red
-    plt.title("Sentiment Counts")
-    plt.xlabel("Sentiment")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    plt.savefig(bar_path, dpi=150)
-    plt.close()
+    fig = Figure(figsize=(6, 4), dpi=96)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    counts.plot(kind="bar", ax=ax, color=["#2ecc71", "#3498db", "#e74c3c"])  # Green, Blue, Red
+    ax.set_title("Sentiment Counts")
+    ax.set_xlabel("Sentiment")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    canvas.print_png(bar_path)
 
     # Pie chart
-    plt.figure(figsize=(5, 5))
-    counts.plot(kind="pie", autopct="%1.1f%%", startangle=140, colors=["#2ecc71", "#3498db", "#e74c3c"])
-    plt.title("Sentiment Distribution")
-    plt.ylabel("")  # hide y-label
-    plt.tight_layout()
-    plt.savefig(pie_path, dpi=150)
-    plt.close()
+    fig = Figure(figsize=(5, 5), dpi=96)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    counts.plot(kind="pie", ax=ax, autopct="%1.1f%%", startangle=140, colors=["#2ecc71", "#3498db", "#e74c3c"])
+    ax.set_title("Sentiment Distribution")
+    ax.set_ylabel("")  # hide y-label
+    fig.tight_layout()
+    canvas.print_png(pie_path)
+
+    with open(version_path, "w") as f:
+        f.write(version)
 
     # Return filenames relative to /static/images
     return "sentiment_bar.png", "sentiment_pie.png"
@@ -253,11 +392,11 @@ def give_review():
     if request.method == "POST":
         review = (request.form.get("review") or "").strip()
         if review:
-            sid = SentimentIntensityAnalyzer()
-            sentiment = sid.polarity_scores(review)['compound']
+            sentiment = _score(review)
             new_review = Review(content=review, sentiment_score=sentiment)
             db.session.add(new_review)
             db.session.commit()
+            reviews_changed()
             flash('Thank you for your feedback!', 'success')
             return render_template("index.html", sentiment=sentiment)
         else:
@@ -268,12 +407,19 @@ def give_review():
 
 @app.route('/get_recommendations')
 def get_recommendations():
-    reviews = [r.content for r in Review.query.all()]
-    if not reviews:
+    rows = Review.query.with_entities(Review.content, Review.sentiment_score).all()
+    if not rows:
         flash("Please submit at least one review to get recommendations.", "warning")
         return redirect(url_for("give_review"))
 
-    sentiments = analyze_sentiments(reviews)
+    reviews = [r.content for r in rows]
+    # Scores are stored on insert; only rescore legacy rows without one
+    sentiments = pd.DataFrame({
+        'compound': [
+            r.sentiment_score if r.sentiment_score is not None else _score(r.content)
+            for r in rows
+        ]
+    })
     transactions = extract_products_from_reviews(reviews)
 
     product_recommendations = generate_recommendations(transactions, sentiments)
@@ -287,12 +433,21 @@ def get_recommendations():
 
 
 @app.route("/stored_reviews")
+@cache.cached(timeout=300, unless=has_pending_flashes,
+              response_filter=is_ok_response, make_cache_key=review_cache_key)
 def view_stored_reviews():
-    stored_reviews = Review.query.order_by(Review.created_at.desc()).all()
+    stored_reviews = (
+        Review.query
+        .with_entities(Review.id, Review.content, Review.sentiment_score, Review.created_at)
+        .order_by(Review.created_at.desc())
+        .all()
+    )
     return render_template("stored_reviews.html", stored_reviews=stored_reviews)
 
 
 @app.route("/charts")
+@cache.cached(timeout=300, unless=has_pending_flashes,
+              response_filter=is_ok_response, make_cache_key=review_cache_key)
 def charts():
     bar_file, pie_file = generate_charts()
     if bar_file is None:
@@ -314,11 +469,10 @@ def seed_demo():
         "Pizza was okay, sauce was great, combo is value for money.",
         "Refund process was smooth. Appreciate the quick response."
     ]
-    sid = SentimentIntensityAnalyzer()
-    for t in demo_texts:
-        score = sid.polarity_scores(t)['compound']
-        db.session.add(Review(content=t, sentiment_score=score))
+    objs = [Review(content=t, sentiment_score=_score(t)) for t in demo_texts]
+    db.session.bulk_save_objects(objs)
     db.session.commit()
+    reviews_changed()
     flash("Seeded demo reviews.", "success")
     return redirect(url_for("view_stored_reviews"))
 
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_db_dir, "reviews.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Keep rendered charts out of the tracked static/images directory
+    monkeypatch.setattr(app_module, "ensure_graph_dir", lambda: str(tmp_path))
+    with app_module.app.app_context():
+        app_module.Review.query.delete()
+        app_module.db.session.commit()
+    app_module.cache.clear()
+    return app_module.app.test_client()
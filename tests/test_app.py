@@ -0,0 +1,32 @@
+import app as app_module
+
+
+def test_pages_render_with_seeded_data(client):
+    client.get("/seed_demo")
+
+    for path in ("/stored_reviews", "/charts", "/get_recommendations"):
+        assert client.get(path).status_code == 200
+
+
+def test_pages_render_after_review_submit(client):
+    client.post("/give_review", data={"review": "Great pizza, fast delivery!"})
+
+    stored = client.get("/stored_reviews")
+    assert stored.status_code == 200
+    assert b"Great pizza, fast delivery!" in stored.data
+    assert client.get("/charts").status_code == 200
+
+
+def test_cached_page_reflects_insert_from_another_worker(client):
+    client.get("/seed_demo")
+    assert b"Terrible sauce" not in client.get("/stored_reviews").data
+
+    # Insert without going through a route, so this process's cache is not cleared
+    with app_module.app.app_context():
+        app_module.db.session.add(app_module.Review(content="Terrible sauce this time.", sentiment_score=-0.5))
+        app_module.db.session.commit()
+    assert b"Terrible sauce" in client.get("/stored_reviews").data
+
+
+def test_charts_redirect_when_empty(client):
+    assert client.get("/charts").status_code == 302